@@ -1,12 +1,15 @@
 #!/usr/bin/env python
 from argparse import ArgumentParser
 from dataclasses import dataclass
+import hashlib
+import json
 import logging
 import logging.config
+import os
 import os.path
 import sys
 import tomllib
-from typing import Any
+from typing import Any, cast
 
 from .util.logging import user_log_file, config_logging
 
@@ -15,7 +18,10 @@ config_logging(
     {
         "version": 1,
         "formatters": {
-            "message_only": {"format": "%(component_name)s: %(message)s"},
+            "message_only": {
+                "class": "bootstep.util.logging.NoTracebackFormatter",
+                "format": "%(component_name)s: %(message)s",
+            },
             "full": {
                 "format": "%(levelname).1s | %(asctime)s | %(name)s | %(component_name)s | %(message)s",
                 "datefmt": "%Y-%m-%d %H:%M:%S %z",
@@ -23,7 +29,7 @@ config_logging(
         },
         "handlers": {
             "console": {
-                "class": "bootstep.util.logging.NoTracebackStreamHandler",
+                "class": "logging.StreamHandler",
                 "formatter": "message_only",
                 "level": "INFO",
                 "stream": "ext://sys.stderr",
@@ -50,6 +56,7 @@ logger = logging.getLogger()
 from .adapter.installer import Installer  # noqa
 from .adapter.merge import ConflictStrategy  # noqa
 from .adapter.rollback import rollback_on_error  # noqa
+from .util.filesys import make_dir, user_data_dir, write_file_atomic  # noqa
 
 
 @dataclass
@@ -159,8 +166,41 @@ def process_installers(
 
 
 def load_params_file(fname: str) -> dict[str, Any]:
+    # Parsed params are cached as JSON, which loads much faster than TOML,
+    # until the file's mtime or size changes
+    st = os.stat(fname)
+    stamp = [st.st_mtime_ns, st.st_size]
+    cache_file = params_cache_file(fname)
+    try:
+        with open(cache_file, "r") as f:
+            cached = json.load(f)
+        if cached["stamp"] == stamp:
+            return cast(dict[str, Any], cached["params"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
     with open(fname, "rb") as f:
-        return tomllib.load(f)
+        params = tomllib.load(f)
+
+    try:
+        data = json.dumps({"stamp": stamp, "params": params})
+    except TypeError:  # e.g. TOML dates and times; don't cache
+        pass
+    else:
+        try:
+            make_dir(os.path.dirname(cache_file), deep=True)
+            write_file_atomic(cache_file, data)
+        except OSError as e:
+            logger.debug(
+                f"Unable to cache params file {fname}: {e}",
+                extra={"component_name": "main"},
+            )
+    return params
+
+
+def params_cache_file(fname: str) -> str:
+    key = hashlib.sha256(os.path.abspath(fname).encode()).hexdigest()
+    return os.path.join(user_data_dir(), "bootstep", "params_cache", f"{key}.json")
 
 
 if __name__ == "__main__":
@@ -1,21 +1,30 @@
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import contextlib
 import logging
+import os
 import os.path
-import platform
-from typing import Any
+import queue
+import sys
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Generator, Iterable, TypeVar
 
 from ..util.filesys import (
     walk_files,
+    list_dir,
     make_dir,
-    copy_file,
-    temp_file_name,
+    move_file_new,
+    temp_file_names,
     make_executable,
 )
-from ..util.subprocess import run_with_output
+from ..util.subprocess import run_with_inherited_stdio
 from ..adapter.template import render, render_file
-from ..adapter.merge import merge_file, ConflictStrategy
+from ..adapter.merge import merge_files, ConflictStrategy
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 INSTALL_SYS_EXT: dict[str, list[str]] = {
     "Windows": [".cmd", ".bat", ".ps", ".py"],
     "Linux": [".sh", ".bash", "", ".py"],
@@ -23,6 +32,20 @@ INSTALL_SYS_EXT: dict[str, list[str]] = {
     "Java": [".jar", ".py"],
 }
 
+# platform.system() values, derived from sys.platform without calling uname
+SYSNAME = (
+    "Java"
+    if sys.platform.startswith("java")
+    else {"win32": "Windows", "linux": "Linux", "darwin": "Darwin"}.get(
+        sys.platform, sys.platform
+    )
+)
+INSTALL_EXT = INSTALL_SYS_EXT.get(SYSNAME, [".py"])
+_INSTALL_EXT_SET = frozenset(INSTALL_EXT)
+
+# Per-file work is dominated by blocking I/O, so use more threads than cores
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
 
 class Installer:
     def __init__(
@@ -41,6 +64,7 @@ class Installer:
         self.post_install_script = post_install_script
         self.conflict_strategy = conflict_strategy
         self.run_install_scripts = run_install_scripts
+        self._meta: dict[str, Any] | None = None
 
     @property
     def source_root_dir(self) -> str:
@@ -63,7 +87,10 @@ class Installer:
         }
 
     def meta(self) -> dict[str, Any]:
-        return {"__install__": self.to_dict()}
+        # Built once: installers are not reconfigured after construction
+        if self._meta is None:
+            self._meta = {"__install__": MappingProxyType(self.to_dict())}
+        return self._meta
 
     def install(self, config: dict[str, Any], dest_dir: str = ".") -> None:
         """Install from pre-rendered config"""
@@ -72,40 +99,116 @@ class Installer:
         component_name = self.component_name
         loginfo = {"component_name": component_name}
 
-        logger.info(f"Installing from {self.source_dir} -> {dest_dir}", extra=loginfo)
+        logger.info(
+            "Installing from %s -> %s", self.source_dir, dest_dir, extra=loginfo
+        )
 
-        if self.run_install_scripts:
-            script = self.find_install_script()
-            if script:
-                logger.info(
-                    f"Running install script {os.path.basename(script)}", extra=loginfo
+        with temp_file_names() as temp_file_name:
+            if self.run_install_scripts:
+                script = self.find_install_script()
+                if script:
+                    logger.info(
+                        "Running install script %s",
+                        os.path.basename(script),
+                        extra=loginfo,
+                    )
+                    render_and_execute_script(
+                        script,
+                        config,
+                        dest_dir,
+                        component_name=component_name,
+                        scopes=scopes,
+                        temp_file_name=temp_file_name,
+                    )
+                else:
+                    logger.warning("No install script found", extra=loginfo)
+            else:
+                logger.info("Skipping install script", extra=loginfo)
+
+            self.install_files(config, dest_dir, scopes=scopes)
+
+            if self.run_install_scripts:
+                post_script = self.find_post_install_script()
+                if post_script:
+                    logger.info(
+                        "Running post-install script %s",
+                        os.path.basename(post_script),
+                        extra=loginfo,
+                    )
+                    render_and_execute_script(
+                        post_script,
+                        config,
+                        dest_dir,
+                        component_name=component_name,
+                        scopes=scopes,
+                        temp_file_name=temp_file_name,
+                    )
+                else:
+                    logger.info("No post-install script found", extra=loginfo)
+            else:
+                logger.info("Skipping post-install script", extra=loginfo)
+
+        logger.info("Installed from %s -> %s", self.source_dir, dest_dir, extra=loginfo)
+
+    def install_files(
+        self,
+        config: dict[str, Any],
+        dest_dir: str,
+        *,
+        scopes: list[dict[str, Any]],
+    ) -> None:
+        component_name = self.component_name
+        loginfo = {"component_name": component_name}
+        # Skip computing relative paths for messages that won't be logged
+        log_info = logger.isEnabledFor(logging.INFO)
+
+        # Group source files by destination, since several may render to one.
+        # Destination dirs are worked out once per source dir, leaving a
+        # render and a join per file.
+        source_root_dir = self.source_root_dir
+        dirs_rendered: dict[str, tuple[str, str]] = {}
+        sources_by_dest: dict[str, list[str]] = {}
+        for dir, entry in prefetch(walk_files(source_root_dir)):
+            rendered = dirs_rendered.get(dir)
+            if rendered is None:
+                rel_dir = os.path.relpath(
+                    render(dir, config, scopes=scopes), source_root_dir
                 )
-                render_and_execute_script(
-                    script,
-                    config,
-                    dest_dir,
-                    component_name=component_name,
-                    scopes=scopes,
+                rendered = dirs_rendered[dir] = (
+                    os.path.join(dest_dir, rel_dir),
+                    "" if rel_dir == os.curdir else rel_dir,
                 )
-            else:
-                logger.warning("No install script found", extra=loginfo)
-        else:
-            logger.info("Skipping install script", extra=loginfo)
-
-        for dir, fname in walk_files(self.source_root_dir):
-            fname_source = os.path.join(dir, fname)
-            dir_rendered = render(dir, config, scopes=scopes)
-            fname_rendered = render(fname, config, scopes=scopes)
-            fname_dest_dir = os.path.join(
-                dest_dir, os.path.relpath(dir_rendered, self.source_root_dir)
-            )
+            fname_dest_dir, rel_dir = rendered
+            fname_rendered = render(entry.name, config, scopes=scopes)
             fname_dest = os.path.join(fname_dest_dir, fname_rendered)
 
-            logger.info(
-                f"Configuring {os.path.relpath(fname_dest, dest_dir)}", extra=loginfo
-            )
+            if log_info:
+                logger.info(
+                    "Configuring %s",
+                    os.path.join(rel_dir, fname_rendered),
+                    extra=loginfo,
+                )
 
-            with temp_file_name(os.path.basename(fname_rendered)) as fname_tmp:
+            sources_by_dest.setdefault(fname_dest, []).append(entry.path)
+
+        # Existing destination dirs and files, from one listing per dir, stand
+        # in for per-file exists() checks
+        dest_dirs: set[str] = set()
+        dest_files: set[str] = set()
+        for fname_dest_dir in {os.path.dirname(d) for d in sources_by_dest}:
+            names = list_dir(fname_dest_dir)
+            if names is not None:
+                dest_dirs.add(fname_dest_dir)
+                dest_files.update(os.path.join(fname_dest_dir, n) for n in names)
+
+        def install_file(
+            fname_dest: str,
+            fnames_source: list[str],
+            temp_file_name: Callable[[str], str],
+        ) -> None:
+            fnames_tmp: list[str] = []
+            for fname_source in fnames_source:
+                fname_tmp = temp_file_name(os.path.basename(fname_dest))
                 size = render_file(
                     fname_source,
                     config,
@@ -115,46 +218,61 @@ class Installer:
                 )
                 if size == 0:
                     continue  # TODO log skipping file
-                else:
-                    if not os.path.exists(fname_dest_dir):
-                        make_dir(fname_dest_dir, deep=True)
-                    if not os.path.exists(fname_dest):
-                        logger.info(
-                            f"Copying to {os.path.relpath(fname_dest, dest_dir)}",
-                            extra=loginfo,
-                        )
-                        copy_file(fname_tmp, fname_dest)
-                    else:
+                fnames_tmp.append(fname_tmp)
+
+            if len(fnames_tmp) == 0:
+                return
+
+            if fname_dest not in dest_files:
+                fname_dest_dir = os.path.dirname(fname_dest)
+                if fname_dest_dir not in dest_dirs:
+                    make_dir(fname_dest_dir, deep=True)
+                    dest_dirs.add(fname_dest_dir)
+                # The listing misses names differing only in case on
+                # case-insensitive filesystems: if the file turns out to exist,
+                # merge with it as below instead
+                if move_file_new(fnames_tmp[0], fname_dest):
+                    fnames_tmp.pop(0)
+                    if log_info:
                         logger.info(
-                            f"Merging with {os.path.relpath(fname_dest, dest_dir)}",
+                            "Copying to %s",
+                            os.path.relpath(fname_dest, dest_dir),
                             extra=loginfo,
                         )
-                        merge_file(
-                            fname_dest,
-                            fname_tmp,
-                            conflict_strategy=self.conflict_strategy,
-                        )
 
-        if self.run_install_scripts:
-            post_script = self.find_post_install_script()
-            if post_script:
-                logger.info(
-                    f"Running post-install script {os.path.basename(post_script)}",
-                    extra=loginfo,
+            if len(fnames_tmp) > 0:
+                if log_info:
+                    logger.info(
+                        "Merging with %s",
+                        os.path.relpath(fname_dest, dest_dir),
+                        extra=loginfo,
+                    )
+                merge_files(
+                    fname_dest,
+                    fnames_tmp,
+                    conflict_strategy=self.conflict_strategy,
                 )
-                render_and_execute_script(
-                    post_script,
-                    config,
-                    dest_dir,
-                    component_name=component_name,
-                    scopes=scopes,
-                )
-            else:
-                logger.info("No post-install script found", extra=loginfo)
-        else:
-            logger.info("Skipping post-install script", extra=loginfo)
 
-        logger.info(f"Installed from {self.source_dir} -> {dest_dir}", extra=loginfo)
+        # Render next to the destination so new files can be moved into place
+        # rather than copied
+        make_dir(dest_dir, deep=True)
+
+        with temp_file_names(dest_dir) as temp_file_name, ThreadPoolExecutor(
+            max_workers=MAX_WORKERS
+        ) as executor:
+            # New files first, then merges into existing ones; each destination
+            # is handled by exactly one task
+            new = [d for d in sources_by_dest if d not in dest_files]
+            existing = [d for d in sources_by_dest if d in dest_files]
+            for fnames_dest in (new, existing):
+                wait_all(
+                    [
+                        executor.submit(
+                            install_file, d, sources_by_dest[d], temp_file_name
+                        )
+                        for d in fnames_dest
+                    ]
+                )
 
     def find_install_script(self) -> str | None:
         return find_script_by_platform(self.source_dir, self.install_script)
@@ -163,16 +281,74 @@ class Installer:
         return find_script_by_platform(self.source_dir, self.post_install_script)
 
 
+def wait_all(futures: list[Future[None]]) -> None:
+    """Wait for futures, cancelling the rest and raising on the first error"""
+    try:
+        for future in as_completed(futures):
+            future.result()
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+
+def prefetch(items: Iterable[T], maxsize: int = 256) -> Generator[T, None, None]:
+    """Iterate over items while a background thread produces the next ones"""
+    q: queue.Queue[tuple[bool, Any]] = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def produce() -> None:
+        # (True, item) for each item, then (False, None) or (False, error)
+        try:
+            for item in items:
+                q.put((True, item))
+                if stop.is_set():
+                    return
+        except BaseException as e:
+            q.put((False, e))
+        else:
+            q.put((False, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            ok, item = q.get()
+            if not ok:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        # Unblock the producer if we stopped early; it puts at most one more
+        stop.set()
+        with contextlib.suppress(queue.Empty):
+            while True:
+                q.get_nowait()
+        thread.join()
+
+
 def find_script_by_platform(source_dir: str, script_name: str) -> str | None:
-    sysname = platform.system()
+    # One scan of source_dir; on a tie the earliest extension in INSTALL_EXT
+    # wins. Names differing only in case count where the filesystem ignores
+    # case (macOS, Windows), as with an exists() check on the expected name.
+    script_name_lower = script_name.lower()
+    found: dict[str, str] = {}
     try:
-        return next(
-            fname
-            for ext in INSTALL_SYS_EXT.get(sysname, [".py"])
-            if os.path.exists(fname := os.path.join(source_dir, script_name + ext))
-        )
-    except StopIteration:
+        with os.scandir(source_dir) as it:
+            for entry in it:
+                name, ext = os.path.splitext(entry.name)
+                ext = ext.lower()
+                if name.lower() != script_name_lower or ext not in _INSTALL_EXT_SET:
+                    continue
+                fname = script_name + ext
+                if entry.name == fname or os.path.exists(
+                    os.path.join(source_dir, fname)
+                ):
+                    found[ext] = os.path.join(source_dir, fname)
+    except OSError:
         return None
+    return next((found[ext] for ext in INSTALL_EXT if ext in found), None)
 
 
 def render_and_execute_script(
@@ -182,14 +358,15 @@ def render_and_execute_script(
     *,
     component_name: str,
     scopes: list[dict[str, Any]] = [],
+    temp_file_name: Callable[[str], str],
 ) -> None:
     ext = os.path.splitext(script_file)[1]
-    with temp_file_name(os.path.basename(script_file)) as tmp_file:
-        render_file(
-            script_file, config, tmp_file, component_name=component_name, scopes=scopes
-        )
-        if ext == ".py":
-            run_with_output(["python", tmp_file], cwd=cwd)
-        else:
-            make_executable(tmp_file)
-            run_with_output([tmp_file], cwd=cwd)
+    tmp_file = temp_file_name(os.path.basename(script_file))
+    render_file(
+        script_file, config, tmp_file, component_name=component_name, scopes=scopes
+    )
+    if ext == ".py":
+        run_with_inherited_stdio(["python", tmp_file], cwd=cwd)
+    else:
+        make_executable(tmp_file)
+        run_with_inherited_stdio([tmp_file], cwd=cwd)
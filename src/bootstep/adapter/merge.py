@@ -1,6 +1,9 @@
+from collections.abc import Sequence
 from enum import Enum
-from fnmatch import fnmatch
+import filecmp
+from fnmatch import translate
 import os.path
+import re
 import tomllib
 import tomli_w
 from typing import Protocol, TypeVar, Any, cast
@@ -10,6 +13,11 @@ from mergedeep import Strategy, merge
 
 from ..util.filesys import copy_file
 
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper  # type: ignore
+
 A = TypeVar("A")
 
 
@@ -22,6 +30,7 @@ class FileMerger(Protocol[A]):
     def load(self, fname: str) -> A:
         pass
 
+    # May update a0 in place: callers should not reuse a0 after merging
     def merge(self, a0: A, a1: A, strategy: Strategy) -> A:
         pass
 
@@ -37,7 +46,7 @@ class TomlMerger:
     def merge(
         self, d0: dict[str, Any], d1: dict[str, Any], strategy: Strategy
     ) -> dict[str, Any]:
-        return cast(dict[str, Any], merge({}, d0, d1, strategy=strategy))
+        return _merge_dicts(d0, d1, strategy)
 
     def dump(self, d: dict[str, Any], fname: str) -> None:
         with open(fname, "wb") as f:
@@ -47,7 +56,7 @@ class TomlMerger:
 class YamlMerger:
     def load(self, fname: str) -> dict[str, Any] | list[Any]:
         with open(fname, "r") as f:
-            v = yaml.safe_load(f)
+            v = yaml.load(f, Loader=YamlLoader)
             if isinstance(v, dict):
                 return cast(dict[str, Any], v)
             elif isinstance(v, list):
@@ -69,9 +78,12 @@ class YamlMerger:
         strategy: Strategy,
     ) -> dict[str, Any] | list[Any]:
         if isinstance(d0, dict) and isinstance(d1, dict):
+            # Not in place: anchors and merge keys can share containers within
+            # d0, which must each get their own copy before being extended
             return cast(dict[str, Any], merge({}, d0, d1, strategy=strategy))
         elif isinstance(d0, list) and isinstance(d1, list):
-            return d0 + d1
+            d0.extend(d1)
+            return d0
         else:
             raise ValueError(
                 "YAML values are different data types and cannot be merged"
@@ -79,27 +91,67 @@ class YamlMerger:
 
     def dump(self, d: dict[str, Any] | list[Any], fname: str) -> None:
         with open(fname, "w") as f:
-            yaml.safe_dump(d, f, sort_keys=False)
+            yaml.dump(d, f, Dumper=YamlDumper, sort_keys=False)
 
 
 class TextMerger:
     def load(self, fname: str) -> list[str]:
-        lines: list[str] = []
         with open(fname, "r") as f:
-            while line := f.readline():
-                lines.append(line.rstrip())
-        return lines
+            # Iterating splits on newlines only, unlike str.splitlines()
+            return [line.rstrip() for line in f]
 
     def merge(self, l0: list[str], l1: list[str], strategy: Strategy) -> list[str]:
         return l0 + [""] + l1  # blank line between
 
     def dump(self, lines: list[str], fname: str) -> None:
         with open(fname, "w") as f:
-            for line in lines:
-                f.write(line)
+            if lines:
+                f.write("\n".join(lines))
                 f.write("\n")
 
 
+def _merge_dicts(
+    d0: dict[str, Any], d1: dict[str, Any], strategy: Strategy
+) -> dict[str, Any]:
+    if strategy == Strategy.TYPESAFE_ADDITIVE:
+        _merge_typesafe_additive(d0, d1)
+        return d0
+    return cast(dict[str, Any], merge(d0, d1, strategy=strategy))
+
+
+def _merge_typesafe_additive(d0: dict[str, Any], d1: dict[str, Any]) -> None:
+    """Same result as mergedeep's TYPESAFE_ADDITIVE, in place and without copies.
+
+    Values from d1 are moved into d0 rather than deep-copied, so d1 (a fresh
+    load) should not be used afterwards.
+    """
+    stack = [(d0, d1)]
+    while stack:
+        dst, src = stack.pop()
+        for k, v1 in src.items():
+            if k not in dst:
+                dst[k] = v1
+                continue
+            v0 = dst[k]
+            if isinstance(v0, dict) and isinstance(v1, dict):
+                stack.append((v0, v1))
+            elif v0 is v1:
+                pass
+            elif type(v0) is not type(v1):
+                raise TypeError(
+                    f"destination type: {type(v0)} differs from source type: "
+                    f'{type(v1)} for key: "{k}"'
+                )
+            elif isinstance(v0, list):
+                v0.extend(v1)
+            elif isinstance(v0, set):
+                v0.update(v1)
+            elif isinstance(v0, tuple):
+                dst[k] = v0 + v1
+            else:
+                dst[k] = v1
+
+
 FILETYPE_MERGER: dict[str, FileMerger[Any]] = {
     ".gitignore": TextMerger(),
     "*.toml": TomlMerger(),
@@ -107,6 +159,22 @@ FILETYPE_MERGER: dict[str, FileMerger[Any]] = {
     "*.yaml": YamlMerger(),
 }
 
+# All patterns in one regex, a named group per merger: first pattern wins
+_MERGER_RE = re.compile(
+    "|".join(
+        f"(?P<m{i}>{translate(os.path.normcase(k))})"
+        for i, k in enumerate(FILETYPE_MERGER)
+    )
+)
+_MERGER_BY_GROUP: dict[str, FileMerger[Any]] = {
+    f"m{i}": v for i, v in enumerate(FILETYPE_MERGER.values())
+}
+
+
+def find_merger(fname: str) -> FileMerger[Any] | None:
+    m = _MERGER_RE.match(os.path.normcase(os.path.basename(fname)))
+    return None if m is None or m.lastgroup is None else _MERGER_BY_GROUP[m.lastgroup]
+
 
 class MergeFileConflict(Exception):
     def __init__(self, dst: str, src: str):
@@ -126,21 +194,40 @@ def merge_file(
     merge_strategy: Strategy = Strategy.TYPESAFE_ADDITIVE,
     conflict_strategy: ConflictStrategy = ConflictStrategy.ERROR,
 ) -> None:
-    try:
-        ftype = next(
-            k for k in FILETYPE_MERGER if fnmatch(os.path.basename(fname_old), k)
-        )
-    except StopIteration:
-        if os.path.exists(fname_old):
-            _handle_conflict(fname_old, fname_new, conflict_strategy)
-        else:
-            copy_file(fname_new, fname_old)
+    merge_files(
+        fname_old,
+        [fname_new],
+        merge_strategy=merge_strategy,
+        conflict_strategy=conflict_strategy,
+    )
+
+
+def merge_files(
+    fname_old: str,
+    fnames_new: Sequence[str],
+    merge_strategy: Strategy = Strategy.TYPESAFE_ADDITIVE,
+    conflict_strategy: ConflictStrategy = ConflictStrategy.ERROR,
+) -> None:
+    """Merge several files into one, loading and dumping the destination once"""
+    if os.path.exists(fname_old):
+        # Content already in place, e.g. on a re-run: nothing to merge
+        fnames_new = [
+            f for f in fnames_new if not filecmp.cmp(fname_old, f, shallow=False)
+        ]
+        if len(fnames_new) == 0:
+            return
+    merger = find_merger(fname_old)
+    if merger is None:
+        for fname_new in fnames_new:
+            if os.path.exists(fname_old):
+                _handle_conflict(fname_old, fname_new, conflict_strategy)
+            else:
+                copy_file(fname_new, fname_old)
     else:
-        merger = FILETYPE_MERGER[ftype]
-        data_old = merger.load(fname_old)
-        data_new = merger.load(fname_new)
-        data_merged = merger.merge(data_old, data_new, strategy=merge_strategy)
-        merger.dump(data_merged, fname_old)
+        data = merger.load(fname_old)
+        for fname_new in fnames_new:
+            data = merger.merge(data, merger.load(fname_new), strategy=merge_strategy)
+        merger.dump(data, fname_old)
 
 
 def _handle_conflict(
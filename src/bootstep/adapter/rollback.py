@@ -1,8 +1,9 @@
 from contextlib import contextmanager
+from dataclasses import dataclass
 import logging
 from typing import Generator
 
-from ..util.subprocess import run_with_output
+from ..util.subprocess import run_with_binary_output, run_with_output
 
 logger = logging.getLogger(__name__)
 
@@ -29,9 +30,21 @@ def rollback_on_error(
     loginfo = {"component_name": f"{component_name}:rollback"}
 
     logger.debug(f"Checking if inside git repo: {dir}", extra=loginfo)
-    check_if_inside_repo(component_name, dir)
-    check_if_current_commit(component_name, dir)
-    has_changes = has_local_changes(dir)
+    status = repo_status(dir)
+    if not status.inside_repo:
+        raise UnableToRollbackError(
+            component_name, dir, "Not inside a git repo. Have you run `git init` yet?"
+        )
+    if not status.has_current_commit:
+        raise UnableToRollbackError(
+            component_name,
+            dir,
+            "No commits to repo yet, or you don't have a commit checked out. "
+            "You must have at least made an initial commit and have it checked out "
+            "in order to rollback. "
+            'Try `git add -A && git commit --allow-empty -m "initial commit"`',
+        )
+    has_changes = status.has_local_changes
 
     if has_changes:
         logger.debug(f"Adding any untracked files to index: {dir}", extra=loginfo)
@@ -55,48 +68,41 @@ def rollback_on_error(
             run_with_output(pop_cmd, cwd=dir)
 
 
-def is_inside_repo(dir: str) -> bool:
-    cmd = ["git", "rev-parse", "--is-inside-work-tree"]
-    rc, o, e = run_with_output(cmd, cwd=dir, check=False)
-    return rc == 0 and o is not None and o.strip() == "true"
-
-
-def check_if_inside_repo(component_name: str, dir: str) -> None:
-    if not is_inside_repo(dir):
-        raise UnableToRollbackError(
-            component_name, dir, "Not inside a git repo. Have you run `git init` yet?"
-        )
-
-
-def has_current_commit(dir: str) -> bool:
-    cmd = ["git", "rev-parse", "HEAD"]
-    rc, _, _ = run_with_output(cmd, cwd=dir, check=False)
-    return rc == 0
-
-
-def check_if_current_commit(component_name: str, dir: str) -> None:
-    if not has_current_commit(dir):
-        raise UnableToRollbackError(
-            component_name,
-            dir,
-            "No commits to repo yet, or you don't have a commit checked out. "
-            "You must have at least made an initial commit and have it checked out "
-            "in order to rollback. "
-            'Try `git add -A && git commit --allow-empty -m "initial commit"`',
-        )
+@dataclass(frozen=True)
+class RepoStatus:
+    inside_repo: bool
+    has_current_commit: bool
+    has_local_changes: bool
 
 
-def has_local_changes(dir: str) -> bool:
-    cmd = ["git", "diff", "--quiet", "HEAD"]
-    rc, _, _ = run_with_output(cmd, cwd=dir, check=False)
-    return not rc == 0
+def repo_status(dir: str) -> RepoStatus:
+    """Check repo, commit and tracked changes with a single git process"""
+    cmd = ["git", "status", "--porcelain=v2", "--branch", "--untracked-files=no"]
+    rc, o, _ = run_with_output(cmd, cwd=dir, check=False)
+    if rc != 0 or o is None:
+        return RepoStatus(False, False, False)
+    lines = o.splitlines()
+    return RepoStatus(
+        inside_repo=True,
+        has_current_commit="# branch.oid (initial)" not in lines,
+        # ordinary, renamed/copied and unmerged entries; headers start with "#"
+        has_local_changes=any(line[:2] in ("1 ", "2 ", "u ") for line in lines),
+    )
 
 
 def add_untracked_in(dir: str) -> None:
-    cmds = [
-        ["git", "stash", "push"],
-        ["git", "add", "."],
-        ["git", "stash", "pop"],
-    ]
-    for cmd in cmds:
-        run_with_output(cmd, cwd=dir)
+    # Stage untracked (non-ignored) files directly, leaving tracked changes as
+    # they are, rather than stashing around `git add .`. Paths are passed
+    # through as bytes on stdin: never decoded, and no command line limit.
+    # Needs git 2.26+.
+    cmd = ["git", "ls-files", "-z", "--others", "--exclude-standard"]
+    _, o, _ = run_with_binary_output(cmd, cwd=dir)
+    if o:
+        add_cmd = [
+            "git",
+            "--literal-pathspecs",
+            "add",
+            "--pathspec-from-file=-",
+            "--pathspec-file-nul",
+        ]
+        run_with_binary_output(add_cmd, cwd=dir, input=o)
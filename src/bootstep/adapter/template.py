@@ -1,4 +1,4 @@
-from collections.abc import Sequence, Iterable
+from collections.abc import Sequence, Iterable, Iterator
 import ustache
 from typing import AnyStr, Any
 
@@ -9,6 +9,11 @@ class _KEY_MISSING:
 
 KEY_MISSING = _KEY_MISSING()
 
+# Compiled token streams for path templates, which are rendered once per
+# walked file. Only render() uses it: file bodies (stream) stay in ustache's
+# smaller default cache, so they neither pile up here nor evict paths.
+TEMPLATE_CACHE: ustache.CompiledTemplateCache = ustache.LRUCache(4096)
+
 
 class TemplateKeyError(KeyError):
     def __init__(
@@ -38,7 +43,7 @@ def _safe_render_getter(
     v = ustache.default_getter(
         scope, scopes, key, default=KEY_MISSING, virtuals=virtuals
     )
-    if v == KEY_MISSING:
+    if v is KEY_MISSING:
         raise KeyError(key)
     return v
 
@@ -48,12 +53,28 @@ def _no_escape(data: bytes) -> bytes:
 
 
 def render(template: str, scope: Any, *, scopes: Iterable[Any]) -> str:
+    if "{{" not in template:  # nothing to render, e.g. most path names
+        return template
     return ustache.render(
         template,
         scope,
         scopes=scopes,
         getter=_safe_render_getter,
         escape=_no_escape,
+        cache=TEMPLATE_CACHE,
+    )
+
+
+def stream(template: bytes, scope: Any, *, scopes: Iterable[Any]) -> Iterator[bytes]:
+    if b"{{" not in template:
+        yield template
+        return
+    yield from ustache.stream(
+        template,
+        scope,
+        scopes=scopes,
+        getter=_safe_render_getter,
+        escape=_no_escape,
     )
 
 
@@ -65,17 +86,33 @@ def render_file(
     component_name: str,
     scopes: Iterable[Any] = [],
 ) -> int:
-    with open(source_file, "r") as src, open(dest_file, "w") as dst:
+    # Bytes in, bytes out: no decoding, and line endings are kept as written
+    with open(source_file, "rb") as src, open(dest_file, "wb") as dst:
         tmpl = src.read()
+        # Write chunks as rendered, stripping leading and trailing whitespace;
+        # whitespace is held back until it is known not to be trailing.
+        size = 0
+        trailing = b""
         try:
-            s = render(tmpl, scope, scopes=scopes).strip()
+            for chunk in stream(tmpl, scope, scopes=scopes):
+                if size == 0:
+                    chunk = chunk.lstrip()
+                content = chunk.rstrip()
+                if content:
+                    dst.write(trailing)
+                    dst.write(content)
+                    size += len(trailing) + len(content)
+                    trailing = chunk[len(content) :]
+                else:
+                    trailing += chunk
         except KeyError as e:
+            key = e.args[0]
             raise TemplateKeyError(
-                e.args[0],
+                # bytes templates look keys up as bytes
+                key.decode() if isinstance(key, bytes) else key,
                 component_name=component_name,
                 source_file=source_file,
                 dest_file=dest_file,
             )
-        dst.write(s)
-        dst.write("\n")
-        return len(s)
+        dst.write(b"\n")
+        return size
@@ -1,27 +1,18 @@
-from logging import StreamHandler, LogRecord
+from logging import Formatter, LogRecord
 import logging.config
 import os.path
-from typing import TYPE_CHECKING, TextIO
 
 from ..util.filesys import make_dir, user_data_dir
 
-if TYPE_CHECKING:
-    BaseStreamHandler = StreamHandler[TextIO]
-else:
-    BaseStreamHandler = StreamHandler
 
-
-# hat tip to Martijn Pieters https://stackoverflow.com/a/54605728/268977
-
-
-class NoTracebackStreamHandler(BaseStreamHandler):
-    def handle(self, record: LogRecord) -> bool:
-        info, cache = record.exc_info, record.exc_text
-        record.exc_info, record.exc_text = None, None
-        try:
-            return super().handle(record)
-        finally:
-            record.exc_info, record.exc_text = info, cache
+class NoTracebackFormatter(Formatter):
+    def format(self, record: LogRecord) -> str:
+        # Leaves out exception and stack info, which stay on the record for
+        # other handlers to format in full
+        record.message = record.getMessage()
+        if self.usesTime():
+            record.asctime = self.formatTime(record, self.datefmt)
+        return self.formatMessage(record)
 
 
 config_logging = logging.config.dictConfig
@@ -30,5 +21,5 @@ config_logging = logging.config.dictConfig
 def user_log_file(name: str, make: bool = False) -> str:
     dir = os.path.join(user_data_dir(), name)
     if make:
-        make_dir(dir, deep=True, exist_ok=True)
+        make_dir(dir, deep=True)
     return os.path.join(dir, f"{name}.log")
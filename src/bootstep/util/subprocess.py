@@ -1,8 +1,15 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import contextlib
 
 import logging
-from subprocess import Popen, PIPE
-from typing import Callable, Sequence, Any
+import os
+from subprocess import Popen, PIPE, DEVNULL
+import sys
+from typing import IO, Callable, Sequence, Any
+
+if sys.platform == "linux":
+    import fcntl
 
 # Note: stolen from pre-commit
 
@@ -10,6 +17,17 @@ logger = logging.getLogger(__name__)
 
 LOGINFO = {"component_name": __name__}
 
+# Capacity requested for output pipes on Linux (default 64 KiB); 1 MiB is the
+# default limit for unprivileged processes
+PIPE_SIZE = 2**20
+
+# Popen defaults, merged under the caller's kwargs
+_STDIN_DEVNULL: dict[str, Any] = {"stdin": DEVNULL}
+_STDIN_PIPE: dict[str, Any] = {"stdin": PIPE}
+_OUTPUT_DEVNULL: dict[str, Any] = {"stdout": DEVNULL, "stderr": DEVNULL}
+_OUTPUT_PIPE: dict[str, Any] = {"stdout": PIPE, "stderr": PIPE}
+_INHERIT_STDIO: dict[str, Any] = {"stdin": None, "stdout": None, "stderr": None}
+
 
 class CalledProcessError(RuntimeError):
     def __init__(
@@ -24,41 +42,66 @@ class CalledProcessError(RuntimeError):
         self.cmd = cmd
         self.stdout = stdout
         self.stderr = stderr
+        self._bytes: bytes | None = None
 
     def __bytes__(self) -> bytes:
-        def _indent_or_none(part: bytes | None) -> bytes:
-            if part:
-                return b"\n    " + part.replace(b"\n", b"\n    ").rstrip()
-            else:
-                return b" (none)"
-
-        return b"".join(
-            (
-                f"command: {self.cmd!r}\n".encode(),
-                f"return code: {self.returncode}\n".encode(),
-                b"stdout:",
-                _indent_or_none(self.stdout),
-                b"\n",
-                b"stderr:",
-                _indent_or_none(self.stderr),
+        # Output may be large and the message is rendered on each str(), so
+        # build it once
+        if self._bytes is None:
+            buf = bytearray(
+                f"command: {self.cmd!r}\nreturn code: {self.returncode}\nstdout:".encode()
             )
-        )
+            _append_indented(buf, self.stdout)
+            buf += b"\nstderr:"
+            _append_indented(buf, self.stderr)
+            self._bytes = bytes(buf)
+        return self._bytes
 
     def __str__(self) -> str:
         return self.__bytes__().decode()
 
 
+def _append_indented(buf: bytearray, part: bytes | None) -> None:
+    if part:
+        # Strip first, so trailing whitespace is never copied; replace() is a
+        # single C-level pass, faster than finding newlines from Python
+        buf += b"\n    "
+        buf += part.rstrip().replace(b"\n", b"\n    ")
+    else:
+        buf += b" (none)"
+
+
 def run_with_binary_output(
-    cmd: Sequence[str], check: bool | Callable[[int], bool] = True, **kwargs: Any
+    cmd: Sequence[str],
+    check: bool | Callable[[int], bool] = True,
+    input: bytes | None = None,
+    discard_output: bool = False,
+    stderr_tail_bytes: int | None = None,
+    **kwargs: Any,
 ) -> tuple[int, bytes | None, bytes | None]:
-    _setdefault_kwargs(kwargs)
+    # Without input there is nothing to write, so don't open a stdin pipe.
+    # Discarded output goes straight to /dev/null; communicate() just waits.
+    kwargs = (
+        (_STDIN_DEVNULL if input is None else _STDIN_PIPE)
+        | (_OUTPUT_DEVNULL if discard_output else _OUTPUT_PIPE)
+        | kwargs
+    )
     try:
-        logger.debug(f"Running command: {cmd}", extra=LOGINFO)
+        logger.debug("Running command: %s", cmd, extra=LOGINFO)
         proc = Popen(cmd, **kwargs)
     except OSError as e:
         returncode, stdout_b, stderr_b = _oserror_to_output(e)
     else:
-        stdout_b, stderr_b = proc.communicate()
+        _set_pipe_size(proc)
+        if stderr_tail_bytes is None or proc.stderr is None:
+            stdout_b, stderr_b = proc.communicate(input)
+        else:
+            # Keep only the end of stderr, read alongside communicate()
+            stderr_pipe, proc.stderr = proc.stderr, None
+            with stderr_pipe, ThreadPoolExecutor(max_workers=1) as executor:
+                tail = executor.submit(_read_tail, stderr_pipe, stderr_tail_bytes)
+                stdout_b, _ = proc.communicate(input)
+                stderr_b = tail.result()
         returncode = proc.returncode
 
     if isinstance(check, bool):
@@ -68,10 +111,21 @@ def run_with_binary_output(
         if check(returncode):
             raise CalledProcessError(returncode, cmd, stdout_b, stderr_b)
 
-    logger.debug(f"Ran command: {cmd}, returncode = {returncode}", extra=LOGINFO)
+    logger.debug("Ran command: %s, returncode = %s", cmd, returncode, extra=LOGINFO)
     return (returncode, stdout_b, stderr_b)
 
 
+def run_many_with_binary_output(
+    cmds: Sequence[Sequence[str]], max_workers: int | None = None, **kwargs: Any
+) -> list[tuple[int, bytes | None, bytes | None]]:
+    """Run commands concurrently, returning results in the order given"""
+    # Threads wait on the children (and their pipes) with the GIL released
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(lambda cmd: run_with_binary_output(cmd, **kwargs), cmds)
+        )
+
+
 def run_with_output(
     cmd: Sequence[str], **kwargs: Any
 ) -> tuple[int, str | None, str | None]:
@@ -81,9 +135,39 @@ def run_with_output(
     return (returncode, stdout, stderr)
 
 
-def _setdefault_kwargs(kwargs: dict[str, Any]) -> None:
-    for arg in ("stdin", "stdout", "stderr"):
-        kwargs.setdefault(arg, PIPE)
+def run_with_output_to_file(
+    cmd: Sequence[str], fname: str, **kwargs: Any
+) -> tuple[int, bytes | None, bytes | None]:
+    # The child writes to the file itself, so its output never passes through us
+    with open(fname, "wb") as f:
+        return run_with_binary_output(cmd, stdout=f, **kwargs)
+
+
+def run_with_inherited_stdio(cmd: Sequence[str], **kwargs: Any) -> int:
+    # Output goes straight to our stdout/stderr rather than through pipes
+    returncode, _, _ = run_with_binary_output(cmd, **(_INHERIT_STDIO | kwargs))
+    return returncode
+
+
+def _set_pipe_size(proc: "Popen[bytes]") -> None:
+    # Larger pipes let the child write more before blocking on us
+    if sys.platform != "linux":
+        return
+    for f in (proc.stdout, proc.stderr):
+        if f is not None:
+            with contextlib.suppress(OSError):
+                fcntl.fcntl(f.fileno(), fcntl.F_SETPIPE_SZ, PIPE_SIZE)
+
+
+def _read_tail(f: IO[bytes], size: int) -> bytes:
+    chunks: deque[bytes] = deque()
+    total = 0
+    while chunk := os.read(f.fileno(), 2**16):
+        chunks.append(chunk)
+        total += len(chunk)
+        while len(chunks) > 1 and total - len(chunks[0]) >= size:
+            total -= len(chunks.popleft())
+    return b"".join(chunks)[-size:] if size > 0 else b""
 
 
 def _oserror_to_output(e: OSError) -> tuple[int, bytes, None]:
@@ -91,8 +175,12 @@ def _oserror_to_output(e: OSError) -> tuple[int, bytes, None]:
 
 
 def force_bytes(exc: Any) -> bytes:
-    with contextlib.suppress(TypeError):
-        return bytes(exc)
-    with contextlib.suppress(Exception):
-        return str(exc).encode()
-    return f"<unprintable {type(exc).__name__} object>".encode()
+    # Only try bytes() where it can work: for other objects, notably OSError,
+    # it would raise (and for ints, return zero bytes)
+    if isinstance(exc, (bytes, bytearray, memoryview)) or hasattr(exc, "__bytes__"):
+        with contextlib.suppress(TypeError):
+            return bytes(exc)
+    try:
+        return str(exc).encode("utf-8", "backslashreplace")
+    except Exception:
+        return f"<unprintable {type(exc).__name__} object>".encode()
@@ -0,0 +1,81 @@
+from copy import deepcopy
+from fnmatch import fnmatch
+from pathlib import Path
+import random
+from typing import Any
+
+from mergedeep import Strategy, merge  # type: ignore[import-untyped]
+import yaml
+
+from bootstep.adapter.merge import (
+    FILETYPE_MERGER,
+    TomlMerger,
+    TextMerger,
+    YamlMerger,
+    find_merger,
+    _merge_typesafe_additive,
+)
+
+
+def test_filetype_merger_matches_on_basename() -> None:
+    assert next(k for k in FILETYPE_MERGER if fnmatch("pyproject.toml", k)) == "*.toml"
+    assert isinstance(find_merger("pyproject.toml"), TomlMerger)
+    assert isinstance(find_merger("some/dir/.gitignore"), TextMerger)
+    assert find_merger("toml") is None
+    assert find_merger("README.md") is None
+
+
+def _random_config(rng: random.Random, depth: int = 0) -> dict[str, Any]:
+    d: dict[str, Any] = {}
+    for _ in range(rng.randint(0, 4)):
+        r = rng.random()
+        if r < 0.4 and depth < 3:
+            v: Any = _random_config(rng, depth + 1)
+        elif r < 0.6:
+            v = [rng.randint(0, 3)]
+        elif r < 0.65:
+            v = {rng.randint(0, 3)}
+        elif r < 0.7:
+            v = (rng.randint(0, 3),)
+        else:
+            v = rng.choice([1, "x", 2.0, True, None])
+        d[rng.choice("abcde")] = v
+    return d
+
+
+def test_merge_typesafe_additive_matches_mergedeep() -> None:
+    rng = random.Random(0)
+    for _ in range(5000):
+        d0, d1 = _random_config(rng), _random_config(rng)
+        try:
+            expected: Any = merge(
+                deepcopy(d0), deepcopy(d1), strategy=Strategy.TYPESAFE_ADDITIVE
+            )
+        except TypeError:
+            expected = TypeError
+        try:
+            actual: Any = deepcopy(d0)
+            _merge_typesafe_additive(actual, deepcopy(d1))
+        except TypeError:
+            actual = TypeError
+        assert actual == expected, (d0, d1)
+
+
+def test_yaml_merge_leaves_anchored_values_alone(tmp_path: Path) -> None:
+    old, new = tmp_path / "ci.yml", tmp_path / "new.yml"
+    old.write_text(".defaults: &defaults\n  script: [lint]\njob:\n  <<: *defaults\n")
+    new.write_text("job:\n  script: [extra]\n")
+    merger = YamlMerger()
+    merged = merger.merge(
+        merger.load(str(old)),
+        merger.load(str(new)),
+        strategy=Strategy.TYPESAFE_ADDITIVE,
+    )
+    merger.dump(merged, str(old))
+
+    text = old.read_text()
+    assert "*" not in text and "&" not in text
+    assert yaml.safe_load(text) == {
+        ".defaults": {"script": ["lint"]},
+        "job": {"script": ["lint", "extra"]},
+    }